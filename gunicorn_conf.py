@@ -0,0 +1,12 @@
+# gunicorn_conf.py
+# Producción: gunicorn -c gunicorn_conf.py tracker_server:app
+# El worker gevent vuelve cooperativos los requests salientes (OSRM/Overpass/
+# RED), así un fetch upstream lento no bloquea al resto de los clientes.
+bind = "0.0.0.0:5000"
+worker_class = "gevent"
+# Un solo worker: todo el estado del simulador (BUSES, OCUPACION, caches)
+# vive en memoria del proceso; con varios workers cada uno vería buses
+# distintos. La concurrencia la dan las conexiones gevent del worker.
+workers = 1
+worker_connections = 1000
+keepalive = 30
@@ -1,51 +1,126 @@
 import cv2
 import os
+import queue
+import threading
 import time
+import numpy as np
+import torch
 from ultralytics import YOLO
 
 
+# Calidad JPEG para los frames de depuración: 80 encodea ~1.5x más rápido
+# y pesa ~40% menos que el 95 por defecto, sin diferencia visible
+_JPEG_PARAMS = [cv2.IMWRITE_JPEG_QUALITY, 80, cv2.IMWRITE_JPEG_OPTIMIZE, 0]
+
+
+# Estados por tramo de ocupación: <=20, <=30, >30
+_ESTADOS = ("Asientos disponibles", "Pasillo disponible", "Llena")
+
+
 def estado_micro(x):
-    if x <= 20:
-        return "Asientos disponibles"
-    if x <= 30:
-        return "Pasillo disponible"
-    if x > 30:
-        return "Llena"
+    # Índice directo sin ramas: (x>20)+(x>30) cae en 0, 1 o 2
+    return _ESTADOS[(x > 20) + (x > 30)]
 
 
-def iniciar_deteccion(model_path='yolov8n.pt', intervalo=10, output_folder='frames_detectados', callback=None):
+def _cargar_modelo(model_path):
+    """
+    Carga el modelo YOLO. Con GPU disponible exporta una única vez a TensorRT
+    y carga el engine (mucho más rápido que el .pt de PyTorch); si la
+    exportación falla se vuelve al .pt sin interrumpir nada.
+    """
+    if model_path.endswith('.pt') and torch.cuda.is_available():
+        engine_path = os.path.splitext(model_path)[0] + '.engine'
+        try:
+            if not os.path.exists(engine_path):
+                print("⏳ Exportando modelo a TensorRT (solo la primera vez)...")
+                YOLO(model_path).export(format='engine', half=True, imgsz=480, device=0)
+            return YOLO(engine_path)
+        except Exception as e:
+            print(f"⚠️ No se pudo usar TensorRT ({e}); se usa el modelo .pt")
+    return YOLO(model_path)
+
+
+def iniciar_deteccion(model_path='yolov8n.pt', intervalo=10, output_folder='frames_detectados', callback=None,
+                      show_preview=True):
     """
     Inicia la detección de personas en tiempo real con YOLO.
+    Captura, inferencia y guardado a disco corren en hilos separados (pipeline),
+    así la cámara no espera a la GPU ni la GPU al disco.
     Si se pasa una función callback, se llama cada vez que hay una nueva detección:
         callback(num_personas)
+    Con show_preview=False no se abre ventana (para correr headless, p. ej. en
+    la micro); se detiene con Ctrl+C.
     """
-    model = YOLO(model_path)
+    model = _cargar_modelo(model_path)
     os.makedirs(output_folder, exist_ok=True)
 
+    # Parámetros de inferencia fijos: imgsz constante, FP16 si hay GPU,
+    # y solo la clase persona (0) para ahorrar NMS/plot de otras clases
+    usa_cuda = torch.cuda.is_available()
+    infer_kwargs = dict(imgsz=480, half=usa_cuda, device=0 if usa_cuda else 'cpu',
+                        classes=[0], conf=0.35, verbose=False)
+
+    # Calentamiento: la primera inferencia paga init de CUDA/cuDNN y carga de
+    # pesos; se hacen un par de pasadas dummy para que la primera detección
+    # real tenga latencia normal
+    dummy = np.zeros((480, 480, 3), dtype=np.uint8)
+    for _ in range(2):
+        model(dummy, **infer_kwargs)
+
     cap = cv2.VideoCapture(0)
     if not cap.isOpened():
         print("❌ No se pudo acceder a la cámara.")
         return
-
-    last_time = time.time()
-    frame_id = 0
-
-    print("🎥 Detección iniciada... Presiona 'q' para salir.\n")
-
-    while True:
-        ret, frame = cap.read()
-        if not ret:
-            print("⚠️ No se pudo leer el frame de la cámara.")
-            break
-
-        current_time = time.time()
-
-        # Detección cada cierto intervalo
-        if current_time - last_time >= intervalo:
+    # Buffer mínimo: siempre se lee el frame más reciente, no uno atrasado
+    cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+    # La detección corre cada `intervalo` segundos: no tiene sentido capturar
+    # en full HD a 30 fps. 640x480@15 en MJPG (decodificado por hardware en la
+    # mayoría de las webcams) baja mucho el CPU y el ancho de banda USB
+    cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*'MJPG'))
+    cap.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
+    cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
+    cap.set(cv2.CAP_PROP_FPS, 15)
+
+    # Pipeline en 3 etapas: captura | inferencia | guardado
+    detener = threading.Event()
+    q_inferencia = queue.Queue(maxsize=2)   # captura -> inferencia (se queda con lo más nuevo)
+    q_guardado = queue.Queue(maxsize=4)     # inferencia -> escritura a disco
+    ultimo = {"frame": None}                # último frame capturado, para la vista previa
+
+    def _capturar():
+        while not detener.is_set():
+            ret, frame = cap.read()
+            if not ret:
+                print("⚠️ No se pudo leer el frame de la cámara.")
+                detener.set()
+                break
+            ultimo["frame"] = frame
+            # Si la cola está llena se descarta el frame más viejo
+            if q_inferencia.full():
+                try:
+                    q_inferencia.get_nowait()
+                except queue.Empty:
+                    pass
+            q_inferencia.put(frame)
+
+    def _inferir():
+        last_time = time.time()
+        while not detener.is_set():
+            try:
+                frame = q_inferencia.get(timeout=0.5)
+            except queue.Empty:
+                continue
+
+            # Detección cada cierto intervalo
+            current_time = time.time()
+            if current_time - last_time < intervalo:
+                continue
             last_time = current_time
 
-            results = model(frame)
-            num_personas = (results[0].boxes.cls == 0).sum().item()
+            results = model(frame, **infer_kwargs)
+            # classes=[0] garantiza que todas las cajas son personas:
+            # basta len(), sin materializar el tensor booleano ni sincronizar GPU
+            num_personas = len(results[0].boxes)
 
             print(f"[{time.strftime('%H:%M:%S')}] {num_personas} personas detectadas.")
             print(estado_micro(num_personas))
@@ -57,18 +132,49 @@ def iniciar_deteccion(model_path='yolov8n.pt', intervalo=10, output_folder='fram
                 except Exception as e:
                     print(f"⚠️ Error al ejecutar callback: {e}")
 
-            annotated_frame = results[0].plot()
+            q_guardado.put(results[0].plot())
+
+    def _guardar():
+        frame_id = 0
+        while not (detener.is_set() and q_guardado.empty()):
+            try:
+                annotated_frame = q_guardado.get(timeout=0.5)
+            except queue.Empty:
+                continue
             save_path = os.path.join(output_folder, f"frame_{frame_id:04d}.jpg")
-            cv2.imwrite(save_path, annotated_frame)
+            cv2.imwrite(save_path, annotated_frame, _JPEG_PARAMS)
             frame_id += 1
 
-        cv2.imshow("Detección de personas (YOLOv8)", frame)
-
-        if cv2.waitKey(1) & 0xFF == ord('q'):
-            break
-
+    hilos = [threading.Thread(target=fn, daemon=True)
+             for fn in (_capturar, _inferir, _guardar)]
+    for h in hilos:
+        h.start()
+
+    if show_preview:
+        print("🎥 Detección iniciada... Presiona 'q' para salir.\n")
+
+        # El hilo principal solo muestra la vista previa y atiende el teclado
+        while not detener.is_set():
+            frame = ultimo["frame"]
+            if frame is not None:
+                cv2.imshow("Detección de personas (YOLOv8)", frame)
+            if cv2.waitKey(1) & 0xFF == ord('q'):
+                detener.set()
+                break
+    else:
+        # Headless: sin imshow/waitKey (nada que copiar al window manager)
+        print("🎥 Detección iniciada (sin vista previa)... Ctrl+C para salir.\n")
+        try:
+            while not detener.is_set():
+                detener.wait(timeout=0.5)
+        except KeyboardInterrupt:
+            detener.set()
+
+    for h in hilos:
+        h.join(timeout=2)
     cap.release()
-    cv2.destroyAllWindows()
+    if show_preview:
+        cv2.destroyAllWindows()
     print("✅ Detección finalizada. Frames guardados en:", output_folder)
 
 
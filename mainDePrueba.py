@@ -1,13 +1,21 @@
 # main.py
 import requests
 import time
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
 
 TRACKER_URL = "http://127.0.0.1:5000"  # o la IP donde corre tracker_server
 
+# Sesión compartida: reutiliza la conexión TCP al tracker en cada ciclo
+# en vez de abrir una nueva por request
+SESSION = requests.Session()
+SESSION.mount("http://", HTTPAdapter(pool_connections=2, pool_maxsize=4))
+SESSION.mount("https://", HTTPAdapter(pool_connections=2, pool_maxsize=4))
+
 def get_buses():
     """Obtener estado de todos los buses desde tracker_server"""
     try:
-        r = requests.get(f"{TRACKER_URL}/sim/buses")
+        r = SESSION.get(f"{TRACKER_URL}/sim/buses")
         r.raise_for_status()
         data = r.json()
         if data.get("ok"):
@@ -19,7 +27,7 @@ def get_buses():
 def get_occupancy():
     """Obtener ocupación de buses desde tracker_server"""
     try:
-        r = requests.get(f"{TRACKER_URL}/occupancy/list")
+        r = SESSION.get(f"{TRACKER_URL}/occupancy/list")
         r.raise_for_status()
         return r.json()
     except Exception as e:
@@ -27,10 +35,15 @@ def get_occupancy():
         return {}
 
 if __name__ == "__main__":
-    while True:
-        buses, destino = get_buses()
-        ocup = get_occupancy()
-        print("Destino:", destino)
-        print("Buses:", buses)
-        print("Ocupación:", ocup)
-        time.sleep(5)
+    # Las dos consultas son independientes: se disparan en paralelo y se
+    # espera una sola latencia de red por ciclo
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        while True:
+            f_buses = pool.submit(get_buses)
+            f_ocup = pool.submit(get_occupancy)
+            buses, destino = f_buses.result()
+            ocup = f_ocup.result()
+            print("Destino:", destino)
+            print("Buses:", buses)
+            print("Ocupación:", ocup)
+            time.sleep(5)
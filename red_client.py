@@ -2,15 +2,29 @@
 import os, requests, time
 from typing import List, Dict, Any
 from google.transit import gtfs_realtime_pb2
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Sesión compartida con keep-alive: los polls consecutivos al feed reutilizan
+# el socket/TLS en vez de pagar un handshake por consulta
+SESSION = requests.Session()
+_ADAPTER = HTTPAdapter(pool_connections=8, pool_maxsize=16,
+                       max_retries=Retry(total=2, backoff_factor=0.2))
+SESSION.mount("https://", _ADAPTER)
+SESSION.mount("http://", _ADAPTER)
+SESSION.headers["Accept-Encoding"] = "gzip"
+
+# Headers armados una sola vez: el token no cambia durante el proceso,
+# no hay que releer el env ni reconstruir el dict en cada fetch
+_HEADERS: Dict[str, str] = {}
+if os.getenv("RED_API_KEY"):
+    _HEADERS["Authorization"] = f"Bearer {os.getenv('RED_API_KEY')}"
 
 def _get(url_env: str) -> bytes:
     url = os.getenv(url_env)
     if not url:
         raise RuntimeError(f"Falta variable {url_env}")
-    headers = {}
-    if os.getenv("RED_API_KEY"):
-        headers["Authorization"] = f"Bearer {os.getenv('RED_API_KEY')}"
-    r = requests.get(url, headers=headers, timeout=10)
+    r = SESSION.get(url, headers=_HEADERS, timeout=10)
     r.raise_for_status()
     return r.content
 
@@ -63,6 +77,6 @@ def trip_updates() -> List[Dict[str, Any]]:
 # Fallback NO OFICIAL (mientras esperas acceso):
 def arrivals_by_stop_xor(stop_code: str) -> Dict[str, Any]:
     url = f"https://api.xor.cl/red/bus-stop/{stop_code}"
-    r = requests.get(url, timeout=10)
+    r = SESSION.get(url, timeout=10)
     r.raise_for_status()
     return r.json()
@@ -50,8 +50,6 @@ while True:
         cv2.imwrite(save_path, annotated_frame)
         print(f"Frame guardado en: {save_path}")
 
-        estado_micro(num_personas)
-
         frame_id += 1
 
     frame_count += 1
@@ -1,9 +1,12 @@
 # tracker_server.py
-import os, time, math, sqlite3, requests
-from typing import Dict, Any, List, Tuple, Optional
-from flask import Flask, request, jsonify, render_template
+import os, time, math, sqlite3, threading, functools, hashlib, requests
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from typing import Dict, Any, List, Tuple, Optional, NamedTuple
+from flask import Flask, request, jsonify, render_template, Response
 from flask_cors import CORS
-from geopy.distance import geodesic
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 # (opcional) gtfs-realtime
 _HAS_GTFS = True
@@ -12,9 +15,63 @@ try:
 except Exception:
     _HAS_GTFS = False
 
+# (opcional) orjson: (de)serialización JSON 2-5x más rápida que la stdlib
+_HAS_ORJSON = True
+try:
+    import orjson  # type: ignore
+except Exception:
+    _HAS_ORJSON = False
+
+def _loads(resp) -> Any:
+    """Decodifica el body JSON de una respuesta HTTP (bytes directos con orjson)."""
+    if _HAS_ORJSON:
+        return orjson.loads(resp.content)
+    return resp.json()
+
+def _ojson(obj, status: int = 200):
+    """Respuesta JSON serializada con orjson; cae a jsonify si no está."""
+    if _HAS_ORJSON:
+        return Response(orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY),
+                        status=status, mimetype="application/json")
+    resp = jsonify(obj)
+    resp.status_code = status
+    return resp
+
+def _ojson_etag(obj):
+    """JSON con ETag por hash del body: si el cliente ya tiene esta versión
+    (If-None-Match), responde 304 sin body — clave para los endpoints que el
+    front sondea cada pocos segundos y que casi nunca cambian entre polls."""
+    resp = _ojson(obj)
+    etag = hashlib.blake2b(resp.get_data(), digest_size=8).hexdigest()
+    if request.headers.get("If-None-Match") == etag:
+        return Response(status=304, headers={"ETag": etag})
+    resp.headers["ETag"] = etag
+    return resp
+
 app = Flask(__name__)
 CORS(app)
 
+# (opcional) flask-compress: gzip/brotli para los JSON grandes (lista de buses,
+# polilíneas de ruta); en móvil el ancho de banda domina el tiempo de respuesta
+try:
+    from flask_compress import Compress  # type: ignore
+    app.config["COMPRESS_ALGORITHM"] = ["br", "gzip"]
+    app.config["COMPRESS_MIN_SIZE"] = 512
+    Compress(app)
+except Exception:
+    pass
+
+# Sesión HTTP compartida: reutiliza sockets/TLS hacia OSRM, ORS, Overpass y RED
+# en vez de abrir una conexión nueva por request
+SESSION = requests.Session()
+# read=0: un upstream que ya aceptó la consulta y viene lento no se reintenta
+# (duplicaría la espera); solo se reintentan fallas de conexión
+_ADAPTER = HTTPAdapter(pool_connections=16, pool_maxsize=32,
+                       max_retries=Retry(total=2, connect=2, read=0, backoff_factor=0.1))
+SESSION.mount("https://", _ADAPTER)
+SESSION.mount("http://", _ADAPTER)
+SESSION.headers["Connection"] = "keep-alive"
+
 # ==================== Config / Estado ====================
 DESTINO = (-33.01295911698026, -71.54156995287777)              # Paradero destino (editable desde la UI)
 OCUPACION: Dict[str, Dict[str, Any]] = {}   # Ocupación por bus
@@ -23,10 +80,18 @@ BUSES: Dict[str, Dict[str, Any]] = {}       # Estado de buses simulados
 # Ruta: ORS si hay API key; si no, OSRM público
 ORS_API_KEY = os.getenv("ORS_API_KEY", "").strip()
 
+# Cache corto para llegadas RED (el front refresca cada pocos segundos;
+# dentro de la ventana todos los clientes comparten una sola consulta upstream)
+RED_ARRIVALS_TTL = float(os.getenv("RED_ARRIVALS_TTL", "2.5"))
+_RED_CACHE: Dict[str, Tuple[float, Any]] = {}   # stop_id -> (expira_en, data)
+_RED_CACHE_LOCK = threading.Lock()
+_RED_INFLIGHT: Dict[str, threading.Event] = {}  # single-flight: una consulta upstream por paradero
+
 # Paradas reales (OSM)
 STOP_MATCH_DIST_M = 60.0          # distancia máx (m) de un paradero a la ruta
 AUTOSTOPS_DWELL_SEC = 5           # dwell (s) por parada
 STOP_RADIUS_KM = 0.02             # 20 m para considerar "llegada" a la parada
+_STOP_RADIUS_DEG2 = (STOP_RADIUS_KM / 111.32) ** 2 * 1.05   # radio² en grados² (prefiltro, con 5% de holgura)
 
 DB = "ocupacion.sqlite"
 def init_db():
@@ -41,33 +106,109 @@ init_db()
 # ==================== Rutas (ORS/OSRM) ====================
 def _route_generate_osrm(src_lat: float, src_lon: float, dst_lat: float, dst_lon: float) -> List[Tuple[float,float]]:
     url = f"https://router.project-osrm.org/route/v1/driving/{src_lon},{src_lat};{dst_lon},{dst_lat}?overview=full&geometries=geojson"
-    r = requests.get(url, timeout=20)
+    r = SESSION.get(url, timeout=20)
     r.raise_for_status()
-    coords = r.json()["routes"][0]["geometry"]["coordinates"]  # [lon,lat]
+    coords = _loads(r)["routes"][0]["geometry"]["coordinates"]  # [lon,lat]
     return [(lat, lon) for lon, lat in coords]
 
 def _route_generate_ors(src_lat: float, src_lon: float, dst_lat: float, dst_lon: float) -> List[Tuple[float,float]]:
     url = "https://api.openrouteservice.org/v2/directions/driving-car"
     params = {"api_key": ORS_API_KEY, "start": f"{src_lon},{src_lat}", "end": f"{dst_lon},{dst_lat}"}
-    r = requests.get(url, params=params, timeout=20)
+    r = SESSION.get(url, params=params, timeout=20)
     r.raise_for_status()
-    coords = r.json()["features"][0]["geometry"]["coordinates"]  # [lon,lat]
+    coords = _loads(r)["features"][0]["geometry"]["coordinates"]  # [lon,lat]
     return [(lat, lon) for lon, lat in coords]
 
-def _generate_route(src_lat: float, src_lon: float, dst_lat: float, dst_lon: float) -> List[Tuple[float,float]]:
+# Pool para disparar las consultas de ruta en paralelo
+_ROUTE_POOL = ThreadPoolExecutor(max_workers=4)
+
+@functools.lru_cache(maxsize=1024)
+def _generate_route_cached(src_lat: float, src_lon: float, dst_lat: float, dst_lon: float) -> Tuple[Tuple[float,float], ...]:
     if ORS_API_KEY:
+        # ORS y OSRM en paralelo: se paga una sola latencia de red y, si ORS
+        # falla, la respuesta de OSRM ya viene en camino (antes el fallback
+        # recién partía tras agotar el timeout de ORS)
+        f_ors = _ROUTE_POOL.submit(_route_generate_ors, src_lat, src_lon, dst_lat, dst_lon)
+        f_osrm = _ROUTE_POOL.submit(_route_generate_osrm, src_lat, src_lon, dst_lat, dst_lon)
         try:
-            return _route_generate_ors(src_lat, src_lon, dst_lat, dst_lon)
+            return tuple(f_ors.result())
         except Exception:
-            pass
-    return _route_generate_osrm(src_lat, src_lon, dst_lat, dst_lon)
+            return tuple(f_osrm.result())
+    return tuple(_route_generate_osrm(src_lat, src_lon, dst_lat, dst_lon))
+
+def _generate_route(src_lat: float, src_lon: float, dst_lat: float, dst_lon: float) -> List[Tuple[float,float]]:
+    # Coordenadas cuantizadas a ~1 m (5 decimales): el mismo par origen/destino
+    # reutiliza la polilínea cacheada en vez de volver a pedirla a OSRM/ORS
+    return list(_generate_route_cached(round(src_lat, 5), round(src_lon, 5),
+                                       round(dst_lat, 5), round(dst_lon, 5)))
+
+# ==================== Haversine vectorizado ====================
+_EARTH_R_KM = 6371.0
+_DEG2RAD = 0.017453292519943295   # pi/180 inline: multiplicar es más barato que math.radians
+
+# (opcional) numba: fusiona el haversine por segmento en un solo loop compilado,
+# sin los arrays temporales que deja la cadena de ufuncs NumPy
+_HAS_NUMBA = True
+try:
+    import numba  # type: ignore
+except Exception:
+    _HAS_NUMBA = False
+
+if _HAS_NUMBA:
+    @numba.njit(fastmath=True, cache=True)
+    def _seg_km_kernel(lat, lon):
+        n = lat.shape[0] - 1
+        out = np.empty(n, dtype=np.float64)
+        for i in range(n):
+            lat1 = lat[i] * 0.017453292519943295
+            lat2 = lat[i+1] * 0.017453292519943295
+            dlat = lat2 - lat1
+            dlon = (lon[i+1] - lon[i]) * 0.017453292519943295
+            a = math.sin(dlat/2.0)**2 + math.cos(lat1)*math.cos(lat2)*math.sin(dlon/2.0)**2
+            out[i] = 2.0 * 6371.0 * math.asin(math.sqrt(a))
+        return out
+
+    # Warmup al importar: la primera llamada paga la compilación JIT (o la
+    # carga desde el cache en disco); mejor aquí que en el primer request
+    _seg_km_kernel(np.zeros(2, dtype=np.float64), np.zeros(2, dtype=np.float64))
+
+def _haversine_km(lat1, lon1, lat2, lon2):
+    """Distancia haversine en km. Acepta escalares o arrays NumPy (broadcast)."""
+    lat1r = lat1 * _DEG2RAD; lon1r = lon1 * _DEG2RAD
+    lat2r = lat2 * _DEG2RAD; lon2r = lon2 * _DEG2RAD
+    dlat = lat2r - lat1r
+    dlon = lon2r - lon1r
+    a = np.sin(dlat/2.0)**2 + np.cos(lat1r)*np.cos(lat2r)*np.sin(dlon/2.0)**2
+    return 2.0 * _EARTH_R_KM * np.arcsin(np.sqrt(a))
+
+def _polyline_seg_km(route: List[Tuple[float,float]]) -> "np.ndarray":
+    """Largo (km) de cada segmento de la polilínea, en una sola pasada."""
+    if not route or len(route) < 2:
+        return np.zeros(0, dtype=np.float64)
+    arr = np.asarray(route, dtype=np.float64)
+    if _HAS_NUMBA:
+        return _seg_km_kernel(np.ascontiguousarray(arr[:,0]), np.ascontiguousarray(arr[:,1]))
+    return _haversine_km(arr[:-1,0], arr[:-1,1], arr[1:,0], arr[1:,1])
 
 # ==================== Paraderos OSM a lo largo de la ruta ====================
 def _bbox_for_route(route: List[Tuple[float,float]], margin_deg: float = 0.01) -> Tuple[float,float,float,float]:
-    lats=[p[0] for p in route]; lons=[p[1] for p in route]
-    return (min(lats)-margin_deg, min(lons)-margin_deg, max(lats)+margin_deg, max(lons)+margin_deg)  # S, W, N, E
+    arr = np.asarray(route, dtype=np.float64)
+    lat_min, lon_min = arr.min(axis=0)
+    lat_max, lon_max = arr.max(axis=0)
+    return (lat_min-margin_deg, lon_min-margin_deg, lat_max+margin_deg, lon_max+margin_deg)  # S, W, N, E
+
+# Los paraderos OSM casi no cambian: cache con TTL largo por bbox, así
+# resimular sobre la misma ruta no vuelve a golpear Overpass
+OVERPASS_TTL = float(os.getenv("OVERPASS_TTL", "300"))
+_OVERPASS_CACHE: Dict[Tuple[float,float,float,float], Tuple[float, List[Dict[str,Any]]]] = {}
+_OVERPASS_LOCK = threading.Lock()
 
 def _overpass_fetch_bus_stops(south: float, west: float, north: float, east: float) -> List[Dict[str,Any]]:
+    key = (round(south,4), round(west,4), round(north,4), round(east,4))
+    with _OVERPASS_LOCK:
+        hit = _OVERPASS_CACHE.get(key)
+        if hit and time.monotonic() < hit[0]:
+            return hit[1]
     q = f"""
     [out:json][timeout:25];
     (
@@ -76,47 +217,68 @@ def _overpass_fetch_bus_stops(south: float, west: float, north: float, east: flo
     );
     out body;
     """
-    r = requests.post("https://overpass-api.de/api/interpreter", data={"data": q}, timeout=30)
+    r = SESSION.post("https://overpass-api.de/api/interpreter", data={"data": q}, timeout=30)
     r.raise_for_status()
-    data = r.json()
-    return data.get("elements", [])
+    data = _loads(r)
+    elems = data.get("elements", [])
+    with _OVERPASS_LOCK:
+        _OVERPASS_CACHE[key] = (time.monotonic() + OVERPASS_TTL, elems)
+    return elems
 
-def _meters_per_deg(lat: float) -> Tuple[float,float]:
-    m_per_deg_lat = 111_320.0
-    m_per_deg_lon = 40075000.0 * math.cos(math.radians(lat)) / 360.0
-    return m_per_deg_lat, m_per_deg_lon
+# Metros por grado, precalculados a nivel de módulo
+_M_PER_DEG_LAT = 111_320.0
+_M_PER_DEG_LON_EQ = 40075000.0 / 360.0   # en el ecuador; se escala por cos(lat)
 
-def _project_dist_along(route: List[Tuple[float,float]], pt: Tuple[float,float]) -> Tuple[float,float]:
-    """(dist_min_m, distancia_recorrida_km_al_pie) del punto respecto a la polilínea."""
+def _meters_per_deg(lat: float) -> Tuple[float,float]:
+    return _M_PER_DEG_LAT, _M_PER_DEG_LON_EQ * math.cos(lat * _DEG2RAD)
+
+def _route_columns(route: List[Tuple[float,float]]) -> Tuple["np.ndarray","np.ndarray","np.ndarray"]:
+    """Columnas SoA de la polilínea: vértices, km por segmento y km acumulados
+    al inicio de cada segmento. Se calculan una vez y se comparten entre todas
+    las proyecciones sobre la misma ruta."""
+    arr = np.asarray(route, dtype=np.float64)
+    seg_km = _polyline_seg_km(route)
+    acc_km = np.concatenate(([0.0], np.cumsum(seg_km)[:-1]))
+    return arr, seg_km, acc_km
+
+def _project_dist_along(route: List[Tuple[float,float]], pt: Tuple[float,float],
+                        cols: Optional[Tuple["np.ndarray","np.ndarray","np.ndarray"]] = None) -> Tuple[float,float]:
+    """(dist_min_m, distancia_recorrida_km_al_pie) del punto respecto a la polilínea.
+
+    Proyecta el punto sobre todos los segmentos a la vez con NumPy en vez de
+    iterar segmento por segmento en Python."""
+    if not route or len(route) < 2:
+        return 1e18, 0.0
     px_lat, px_lon = pt
-    min_d = 1e18
-    acc_km = 0.0
-    best_along_km = 0.0
-    for i in range(len(route)-1):
-        a = route[i]; b = route[i+1]
-        lat_ref = (a[0]+b[0])/2.0
-        mlat, mlon = _meters_per_deg(lat_ref)
-        ax, ay = (a[1]*mlon, a[0]*mlat)
-        bx, by = (b[1]*mlon, b[0]*mlat)
-        px, py = (px_lon*mlon, px_lat*mlat)
-
-        vx, vy = (bx-ax, by-ay); wx, wy = (px-ax, py-ay)
-        seg_len2 = vx*vx + vy*vy
-        t = 0.0 if seg_len2==0 else max(0.0, min(1.0, (wx*vx + wy*vy)/seg_len2))
-        projx, projy = (ax + t*vx, ay + t*vy)
-        dist_m = math.hypot(px-projx, py-projy)
-        if dist_m < min_d:
-            min_d = dist_m
-            seg_km = geodesic(a, b).km
-            best_along_km = acc_km + seg_km * t
-        acc_km += geodesic(a, b).km
-    return min_d, best_along_km
+    arr, seg_km, acc_km = cols if cols is not None else _route_columns(route)
+    a = arr[:-1]; b = arr[1:]
+
+    lat_ref = (a[:,0] + b[:,0]) / 2.0
+    mlat = _M_PER_DEG_LAT
+    mlon = _M_PER_DEG_LON_EQ * np.cos(lat_ref * _DEG2RAD)
+    ax, ay = (a[:,1]*mlon, a[:,0]*mlat)
+    bx, by = (b[:,1]*mlon, b[:,0]*mlat)
+    px, py = (px_lon*mlon, px_lat*mlat)
+
+    vx, vy = (bx-ax, by-ay); wx, wy = (px-ax, py-ay)
+    seg_len2 = vx*vx + vy*vy
+    t = np.clip((wx*vx + wy*vy) / np.where(seg_len2==0, 1.0, seg_len2), 0.0, 1.0)
+    t = np.where(seg_len2==0, 0.0, t)
+    dist_m = np.hypot(px-(ax+t*vx), py-(ay+t*vy))
+
+    i = int(np.argmin(dist_m))
+    return float(dist_m[i]), float(acc_km[i] + seg_km[i]*t[i])
 
 def _polyline_total_km(route: List[Tuple[float,float]]) -> float:
-    tot = 0.0
-    for i in range(len(route)-1):
-        tot += geodesic(route[i], route[i+1]).km
-    return tot
+    return float(_polyline_seg_km(route).sum())
+
+class _StopCand(NamedTuple):
+    """Candidato a paradero proyectado sobre la ruta."""
+    d_m: float        # distancia perpendicular a la ruta (m)
+    along_km: float   # km recorridos hasta el pie de la proyección
+    lat: float
+    lon: float
+    name: str
 
 def _osm_stops_along_route(route: List[Tuple[float,float]]) -> List[Tuple[float,float,str]]:
     """Paraderos reales (lat, lon, name) ordenados según sentido de la ruta."""
@@ -129,31 +291,58 @@ def _osm_stops_along_route(route: List[Tuple[float,float]]) -> List[Tuple[float,
         print("WARN Overpass:", e)
         return []
 
-    total_km = _polyline_total_km(route)
-    items = []
-    for el in elems:
-        lat = float(el.get("lat")); lon = float(el.get("lon"))
-        name = (el.get("tags") or {}).get("name","Paradero")
-        d_m, along_km = _project_dist_along(route, (lat,lon))
-        if d_m <= STOP_MATCH_DIST_M and 0.0 <= along_km <= total_km:
-            items.append((d_m, along_km, lat, lon, name))
-
-    # Orden por distancia a lo largo
-    items.sort(key=lambda x: x[1])
-
-    # Deduplicación de paraderos muy cercanos
+    # Columnas de la ruta calculadas una sola vez y compartidas por todas
+    # las proyecciones (antes se reconstruían por cada paradero)
+    cols = _route_columns(route)
+    total_km = float(cols[1].sum())
+
+    # Columnas lat/lon/nombre de los elementos Overpass en una pasada,
+    # en vez de convertir campo por campo dentro del loop
+    n = len(elems)
+    el_lats = np.fromiter((el.get("lat") for el in elems), dtype=np.float64, count=n)
+    el_lons = np.fromiter((el.get("lon") for el in elems), dtype=np.float64, count=n)
+    el_names = [(el.get("tags") or {}).get("name","Paradero") for el in elems]
+
+    d_m = np.empty(n, dtype=np.float64)
+    along = np.empty(n, dtype=np.float64)
+    for i in range(n):
+        d_m[i], along[i] = _project_dist_along(route, (el_lats[i], el_lons[i]), cols=cols)
+
+    # Filtro como máscara booleana única en vez de un branch por elemento;
+    # los items solo se materializan para los sobrevivientes
+    keep = np.where((d_m <= STOP_MATCH_DIST_M) & (along >= 0.0) & (along <= total_km))[0]
+
+    # Orden por distancia a lo largo: argsort sobre la columna numérica,
+    # sin comparador Python por elemento
+    keep = keep[np.argsort(along[keep], kind="stable")]
+    items = [_StopCand(float(d_m[i]), float(along[i]), float(el_lats[i]), float(el_lons[i]), el_names[i])
+             for i in keep]
+
+    # Deduplicación de paraderos muy cercanos: una pasada con el último
+    # conservado en locales (sin indexar dedup[-1] en cada comparación)
     dedup = []
     MIN_GAP_M = 80.0
+    last_d_m = 0.0; last_along = -1e18
     for it in items:
-        if dedup and (it[1]-dedup[-1][1])*1000.0 < MIN_GAP_M:
-            if it[0] < dedup[-1][0]:
+        if dedup and (it.along_km-last_along)*1000.0 < MIN_GAP_M:
+            if it.d_m < last_d_m:
                 dedup[-1] = it
+                last_d_m, last_along = it.d_m, it.along_km
         else:
             dedup.append(it)
+            last_d_m, last_along = it.d_m, it.along_km
 
-    return [(lat, lon, name) for (_, _, lat, lon, name) in dedup]
+    return [(it.lat, it.lon, it.name) for it in dedup]
 
 # ==================== Distancias / movimiento ====================
+def _route_cum_km(bus: Dict[str, Any]) -> "np.ndarray":
+    """Km acumulados en cada vértice de la ruta del bus (columna precalculada)."""
+    cum = bus.get("route_cum_km")
+    if cum is None:
+        cum = np.concatenate(([0.0], np.cumsum(_polyline_seg_km(bus.get("route") or []))))
+        bus["route_cum_km"] = cum
+    return cum
+
 def _remaining_route_km(bus: Dict[str, Any]) -> Optional[float]:
     route = bus.get("route") or []
     if not route or len(route)<2:
@@ -162,9 +351,9 @@ def _remaining_route_km(bus: Dict[str, Any]) -> Optional[float]:
     lat, lon = bus["lat"], bus["lon"]
     rem = 0.0
     if idx < len(route)-1:
-        rem += geodesic((lat,lon), route[idx+1]).km
-        for i in range(idx+1, len(route)-1):
-            rem += geodesic(route[i], route[i+1]).km
+        cum = _route_cum_km(bus)
+        rem += float(_haversine_km(lat, lon, route[idx+1][0], route[idx+1][1]))
+        rem += float(cum[-1] - cum[idx+1])
     return rem
 
 def _advance_along_route(bus: Dict[str, Any], step_km: float):
@@ -173,12 +362,12 @@ def _advance_along_route(bus: Dict[str, Any], step_km: float):
         return False
     idx = int(bus.get("idx",0))
     lat, lon = bus["lat"], bus["lon"]
-    if idx==0 and geodesic((lat,lon), route[0]).km>0.01 and not bus.get("placed"):
+    if idx==0 and float(_haversine_km(lat, lon, route[0][0], route[0][1]))>0.01 and not bus.get("placed"):
         lat, lon = route[0]
         bus["placed"]=True
     while step_km>0 and idx < len(route)-1:
         nlat,nlon = route[idx+1]
-        dist_km = geodesic((lat,lon),(nlat,nlon)).km
+        dist_km = float(_haversine_km(lat, lon, nlat, nlon))
         if dist_km < 1e-6:
             idx+=1
             continue
@@ -222,8 +411,15 @@ def _check_stop_and_dwell(bus: Dict[str, Any], now: float):
         return
 
     tgt = stops[next_idx]  # (lat, lon)
+    # Prefiltro equirectangular: dos multiplicaciones y una comparación
+    # descartan la gran mayoría de los ticks sin pagar el haversine exacto
+    dlat = bus["lat"] - tgt[0]
+    dlon = (bus["lon"] - tgt[1]) * math.cos(tgt[0] * _DEG2RAD)
+    if dlat*dlat + dlon*dlon > _STOP_RADIUS_DEG2:
+        return
+
     # ¿está dentro del radio de llegada?
-    if geodesic((bus["lat"], bus["lon"]), (tgt[0], tgt[1])).km <= STOP_RADIUS_KM and not bus.get("is_dwell", False):
+    if float(_haversine_km(bus["lat"], bus["lon"], tgt[0], tgt[1])) <= STOP_RADIUS_KM and not bus.get("is_dwell", False):
         # anclar posición exactamente en la parada
         bus["lat"], bus["lon"] = tgt[0], tgt[1]
         # activar dwell y avanzar el índice de la siguiente parada
@@ -268,20 +464,32 @@ def _advance_bus(bus: Dict[str, Any], destino: tuple):
     _check_stop_and_dwell(bus, now)
 
 # ==================== Endpoints básicos ====================
+# index.html no usa variables Jinja: se renderiza una única vez y se sirve
+# como bytes con ETag (304 en las recargas del mismo cliente)
+_INDEX_CACHE: Dict[str, Any] = {}
+
 @app.route("/")
 def index():
-    return render_template("index.html")
+    if "body" not in _INDEX_CACHE:
+        body = render_template("index.html").encode("utf-8")
+        _INDEX_CACHE["body"] = body
+        _INDEX_CACHE["etag"] = hashlib.blake2b(body, digest_size=8).hexdigest()
+    etag = _INDEX_CACHE["etag"]
+    if request.headers.get("If-None-Match") == etag:
+        return Response(status=304, headers={"ETag": etag})
+    return Response(_INDEX_CACHE["body"], mimetype="text/html; charset=utf-8",
+                    headers={"ETag": etag, "Cache-Control": "no-cache"})
 
 @app.route("/get_destination")
 def get_destination():
-    return jsonify({"destino": DESTINO})
+    return _ojson({"destino": DESTINO})
 
 @app.route("/set_destination", methods=["POST"])
 def set_destination():
     global DESTINO
     d = request.get_json(force=True)
     DESTINO = (float(d["lat"]), float(d["lon"]))
-    return jsonify({"message":"ok","destino":DESTINO})
+    return _ojson({"message":"ok","destino":DESTINO})
 
 # ==================== Ocupación ====================
 @app.route("/occupancy", methods=["POST"])
@@ -295,9 +503,9 @@ def occupancy_update():
     capacity = data.get("capacity", 40)
 
     if not bus_id:
-        return jsonify({"ok": False, "error": "bus_id missing"}), 400
+        return _ojson({"ok": False, "error": "bus_id missing"}, 400)
     if count is None:
-        return jsonify({"ok": False, "error": "count missing"}), 400
+        return _ojson({"ok": False, "error": "count missing"}, 400)
 
     ts = time.strftime("%Y-%m-%d %H:%M:%S")
 
@@ -319,11 +527,11 @@ def occupancy_update():
     con.commit()
     con.close()
 
-    return jsonify({"ok": True})
+    return _ojson({"ok": True})
 
 @app.route("/occupancy/list")
 def occupancy_list():
-    return jsonify(OCUPACION)
+    return _ojson_etag(OCUPACION)
 
 # ==================== Simulador ====================
 @app.route("/sim/start", methods=["POST"])
@@ -345,6 +553,8 @@ def sim_start():
         points = _generate_route(lat,lon, DESTINO[0],DESTINO[1])
         if points and len(points)>=2:
             BUSES[bus_id]["route"]=points
+            # Columnas SoA de la ruta: vértices y km acumulados, calculados una vez
+            BUSES[bus_id]["route_cum_km"]=np.concatenate(([0.0], np.cumsum(_polyline_seg_km(points))))
             BUSES[bus_id]["idx"]=0
             BUSES[bus_id]["placed"]=False
     except Exception as e:
@@ -363,7 +573,7 @@ def sim_start():
         BUSES[bus_id]["stop_names"] = [a[2] for a in auto_stops]
         BUSES[bus_id]["next_stop_idx"] = 0
 
-    return jsonify({"ok":True,"bus_id":bus_id,"points":points,"auto_stops":auto_stops,"dwell_sec":AUTOSTOPS_DWELL_SEC})
+    return _ojson({"ok":True,"bus_id":bus_id,"points":points,"auto_stops":auto_stops,"dwell_sec":AUTOSTOPS_DWELL_SEC})
 
 @app.route("/sim/stop", methods=["POST"])
 def sim_stop():
@@ -371,7 +581,7 @@ def sim_stop():
     bus_id=str(d.get("bus_id",""))
     if bus_id in BUSES:
         del BUSES[bus_id]
-    return jsonify({"ok":True})
+    return _ojson({"ok":True})
 
 @app.route("/sim/buses")
 def sim_buses():
@@ -383,7 +593,7 @@ def sim_buses():
 
         dist_route = _remaining_route_km(bus)
         if dist_route is None:
-            dist_km = geodesic((bus["lat"], bus["lon"]), DESTINO).km
+            dist_km = float(_haversine_km(bus["lat"], bus["lon"], DESTINO[0], DESTINO[1]))
             distance_kind = "straight"
         else:
             dist_km = max(0.0, dist_route)
@@ -434,7 +644,7 @@ def sim_buses():
             "occ_status": occ_status
         })
 
-    return jsonify({
+    return _ojson_etag({
         "ok": True,
         "destino": DESTINO,
         "buses": out
@@ -443,14 +653,50 @@ def sim_buses():
 # ==================== Fallback RED no oficial ====================
 @app.route("/red/arrivals/<stop_id>")
 def red_arrivals(stop_id:str):
+    now = time.monotonic()
+    with _RED_CACHE_LOCK:
+        hit = _RED_CACHE.get(stop_id)
+        if hit and now < hit[0]:
+            return _ojson({"ok":True,"data":hit[1]})
+        # Single-flight: si otro hilo ya está consultando este paradero,
+        # no se duplica la consulta upstream; se espera su resultado
+        ev = _RED_INFLIGHT.get(stop_id)
+        lider = ev is None
+        if lider:
+            ev = threading.Event()
+            _RED_INFLIGHT[stop_id] = ev
+
+    if not lider:
+        ev.wait(timeout=12)
+        with _RED_CACHE_LOCK:
+            hit = _RED_CACHE.get(stop_id)
+        if hit:
+            return _ojson({"ok":True,"data":hit[1]})
+        return _ojson({"ok":False,"error":"upstream sin respuesta"}, 502)
+
     try:
-        r=requests.get(f"https://api.xor.cl/red/bus-stop/{stop_id}",timeout=10)
+        r=SESSION.get(f"https://api.xor.cl/red/bus-stop/{stop_id}",timeout=10)
         r.raise_for_status()
-        return jsonify({"ok":True,"data":r.json()})
+        data = _loads(r)
+        with _RED_CACHE_LOCK:
+            _RED_CACHE[stop_id] = (time.monotonic() + RED_ARRIVALS_TTL, data)
+        return _ojson({"ok":True,"data":data})
     except Exception as e:
-        return jsonify({"ok":False,"error":str(e)}),500
+        return _ojson({"ok":False,"error":str(e)}, 500)
+    finally:
+        with _RED_CACHE_LOCK:
+            _RED_INFLIGHT.pop(stop_id, None)
+        ev.set()
 
 # ==================== Main ====================
 if __name__=="__main__":
     print("Servidor iniciado. Abre http://127.0.0.1:5000  (o http://<IP_LAN>:5000)")
-    app.run(host="0.0.0.0", port=5000, debug=True)
\ No newline at end of file
+    print("Producción: gunicorn -c gunicorn_conf.py tracker_server:app")
+    try:
+        # waitress atiende varios requests a la vez; el server de debug de
+        # Werkzeug serializa todo (cada fetch a OSRM/WS bloquea a los demás)
+        from waitress import serve
+        serve(app, host="0.0.0.0", port=5000, threads=16)
+    except ImportError:
+        print("WARN: waitress no instalado; usando el server de desarrollo")
+        app.run(host="0.0.0.0", port=5000, debug=True)
\ No newline at end of file